@@ -3,6 +3,38 @@ from tkinter import filedialog, messagebox, Toplevel, ttk
 import os
 import threading
 
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.wav', '.m4a')
+
+# Tag metadata warmed in the background as folders are picked, shared with the merge worker
+metadata_cache = {}
+
+# Cancel flag of the scan currently running for each folder entry. Setting it stops the
+# metadata prefetch; replacing it (a new folder was picked) also stops the count and its label updates.
+folder_scans = {}
+
+# Merge engine, created on first use so the window opens before mutagen is imported
+engine = None
+engine_lock = threading.Lock()
+
+# Status text and progress bar position for each engine stage
+MERGE_STAGES = {
+    "load_priority": ("📁 Loading your main playlist...", 20),
+    "load_secondary": ("📁 Loading your second playlist...", 40),
+    "match": ("🔍 Finding and matching your songs...", 60),
+    "copy": ("📂 Creating your merged playlist...", 80),
+}
+
+def get_engine():
+    """
+    Returns the shared TrackSyncEngine, so tag metadata survives between merges.
+    """
+    global engine
+    with engine_lock:
+        if engine is None:
+            from tracksync_engine import TrackSyncEngine
+            engine = TrackSyncEngine(metadata_cache=metadata_cache)
+    return engine
+
 def select_folder(entry, label, button):
     """
     Opens a file dialog for the user to select a folder and updates the corresponding entry widget.
@@ -12,18 +44,68 @@ def select_folder(entry, label, button):
     if folder:
         entry.delete(0, tk.END)
         entry.insert(0, folder)
+        button.config(text="Change", bg="#E8F5E8")
+
+        # Stop any scan still running for the previously selected folder
+        previous_scan = folder_scans.get(entry)
+        if previous_scan is not None:
+            previous_scan.set()
+        cancel_event = threading.Event()
+        folder_scans[entry] = cancel_event
 
-        # Visual feedback - show folder name and file count
         folder_name = os.path.basename(folder)
+        label.config(text=f"⏳ {folder_name} (scanning...)", fg="#1976D2", font=("Segoe UI", 9))
+
+        threading.Thread(
+            target=scan_folder,
+            args=(folder, entry, label, cancel_event),
+            daemon=True,
+        ).start()
+
+def scan_folder(folder, entry, label, cancel_event):
+    """
+    Counts the audio files in a folder off the main thread, updating the label as it goes,
+    then warms the metadata cache so the merge finds most tags already loaded.
+    """
+    folder_name = os.path.basename(folder)
+
+    def superseded():
+        return folder_scans.get(entry) is not cancel_event
+
+    def update_label(text, fg="#2E7D32"):
+        # Tk widgets must be touched from the main loop; drop updates from a superseded scan
+        def apply():
+            if not superseded():
+                label.config(text=text, fg=fg, font=("Segoe UI", 9))
+        label.after(0, apply)
+
+    audio_paths = []
+    try:
+        with os.scandir(folder) as entries:
+            for dir_entry in entries:
+                if superseded():
+                    return
+                if dir_entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                    audio_paths.append(dir_entry.path)
+                    if len(audio_paths) % 100 == 0:
+                        update_label(f"⏳ {folder_name} ({len(audio_paths)} audio files so far...)", fg="#1976D2")
+    except OSError:
+        update_label(f"✓ {folder_name}")
+        return
+
+    update_label(f"✓ {folder_name} ({len(audio_paths)} audio files)")
+
+    merge_engine = get_engine()
+    from mutagen import MutagenError
+
+    for path in audio_paths:
+        if cancel_event.is_set():
+            return
         try:
-            file_count = len([f for f in os.listdir(folder)
-                              if f.lower().endswith(('.mp3', '.flac', '.wav', '.m4a'))])
-            label.config(text=f"✓ {folder_name} ({file_count} audio files)",
-                         fg="#2E7D32", font=("Segoe UI", 9))
-            button.config(text="Change", bg="#E8F5E8")
-        except:
-            label.config(text=f"✓ {folder_name}", fg="#2E7D32", font=("Segoe UI", 9))
-            button.config(text="Change", bg="#E8F5E8")
+            merge_engine.track_metadata(path)
+        except (OSError, MutagenError):
+            # Failed reads aren't cached, so the merge tries the file again and counts it as skipped
+            continue
 
 def start_process(script_mode, priority_entry, secondary_entry, output_entry, status_label, progress_var, run_button):
     """
@@ -52,6 +134,11 @@ def start_process(script_mode, priority_entry, secondary_entry, output_entry, st
                                    f"The folder '{output_folder_name}' already exists.\n\nDo you want to overwrite it?"):
             return
 
+    # Stop warming tags in the background, or the scan and the merge would both read
+    # every file that isn't cached yet
+    for cancel_event in folder_scans.values():
+        cancel_event.set()
+
     # Disable run button and show progress
     run_button.config(state="disabled", text="Processing...", bg="#CCCCCC")
     status_label.config(text="🔄 Starting to merge your playlists...", fg="#1976D2")
@@ -70,38 +157,27 @@ def run_tracksync(script_mode, priority_folder, secondary_folder, output_folder,
     Enhanced processing with better user feedback and progress updates.
     """
     try:
-        # Import appropriate script
-        if script_mode == "Preserve Numbering":
-            from tracksync import load_files_with_metadata, match_tracks, renumber_and_copy_files
-        else:
-            from tracksyncclean import load_files_with_metadata, match_tracks, renumber_and_copy_files
-
-        # Step 1: Load priority folder
-        status_label.config(text="📁 Loading your main playlist...", fg="#1976D2")
-        progress_var.set(20)
-        priority_files = load_files_with_metadata(priority_folder)
-
-        # Step 2: Load secondary folder
-        status_label.config(text="📁 Loading your second playlist...", fg="#1976D2")
-        progress_var.set(40)
-        secondary_files = load_files_with_metadata(secondary_folder)
-
-        # Step 3: Match tracks
-        status_label.config(text="🔍 Finding and matching your songs...", fg="#1976D2")
-        progress_var.set(60)
-        final_list = match_tracks(priority_files, secondary_files)
-
-        # Step 4: Copy files
-        status_label.config(text="📂 Creating your merged playlist...", fg="#1976D2")
-        progress_var.set(80)
-        renumber_and_copy_files(final_list, output_folder)
+        from tracksync_engine import NAMING_STYLES
+
+        def on_progress(stage, done, total):
+            text, position = MERGE_STAGES[stage]
+            if stage == "copy":
+                # Copying is the long step, so let the bar move through the last 20%
+                position += 20 * done // max(total, 1)
+            status_label.config(text=text, fg="#1976D2")
+            progress_var.set(position)
+
+        result = get_engine().merge(priority_folder, secondary_folder, output_folder,
+                                    naming=NAMING_STYLES[script_mode], progress=on_progress)
 
         # Success
         progress_var.set(100)
         status_label.config(text="🎉 Success! Your playlists have been merged!", fg="#2E7D32")
 
         result_msg = f"✅ Successfully merged your playlists!\n\n"
-        result_msg += f"📊 Total tracks processed: {len(final_list)}\n"
+        result_msg += f"📊 Total tracks processed: {len(result.order)}\n"
+        if result.failed:
+            result_msg += f"⚠️ Files skipped: {len(result.failed)}\n"
         result_msg += f"📁 Saved to: {os.path.basename(output_folder)}\n\n"
         result_msg += f"Your merged playlist is ready to enjoy! 🎵"
 
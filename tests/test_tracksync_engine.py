@@ -0,0 +1,53 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracksync_engine import CleanNaming, TrackSyncEngine
+
+
+def write_wav(path):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\0\0" * 800)
+
+
+class TrackSyncEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.priority = os.path.join(self.root, "Playlist1")
+        self.secondary = os.path.join(self.root, "Playlist2")
+        os.makedirs(self.priority)
+        os.makedirs(self.secondary)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_corrupt_file_is_skipped_and_the_merge_continues(self):
+        write_wav(os.path.join(self.priority, "001. First.wav"))
+        with open(os.path.join(self.priority, "002. Broken.mp3"), "wb") as f:
+            f.write(b"this is not an mpeg stream" * 10)
+
+        output = os.path.join(self.root, "Merged")
+        result = TrackSyncEngine(naming=CleanNaming()).merge(self.priority, self.secondary, output)
+
+        self.assertEqual([track["filename"] for track in result.order], ["001. First.wav"])
+        self.assertEqual(len(result.copied), 1)
+        self.assertEqual(len(result.failed), 1)
+
+        skipped = result.failed[0]
+        self.assertEqual(os.path.basename(skipped.source), "002. Broken.mp3")
+        self.assertEqual(skipped.status, "unreadable")
+        self.assertTrue(skipped.error)
+        self.assertEqual(os.listdir(output), ["Track 001 - First.wav"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracksync_engine import TrackSyncEngine
+from tracksync_layout import INDEX_FILENAME, OutputLayout
+
+
+class OutputLayoutTest(unittest.TestCase):
+
+    def test_padding_grows_past_999_tracks(self):
+        layout = OutputLayout()
+
+        self.assertEqual(layout.track_path(1, 999, "Song.mp3"), "Track 001 - Song.mp3")
+        self.assertEqual(layout.track_path(1, 1000, "Song.mp3"), "Track 0001 - Song.mp3")
+        self.assertEqual(layout.track_path(1000, 1000, "Song.mp3"), "Track 1000 - Song.mp3")
+
+    def test_shard_folders_follow_position(self):
+        layout = OutputLayout(shard_size=10)
+        track_count = 1005
+
+        for position in (1, 10, 11, 999, 1000, 1001, 1005):
+            shard, filename = layout.track_path(position, track_count, "Song.mp3").split("/")
+            self.assertEqual(int(shard), (position - 1) // 10 + 1)
+            # 101 shards, so three digits; 1005 tracks, so four digits
+            self.assertEqual(len(shard), 3)
+            self.assertEqual(filename, f"Track {position:04d} - Song.mp3")
+
+        self.assertEqual(OutputLayout(shard_size=1).track_path(5, 1000, "a.mp3"), "0005/Track 0005 - a.mp3")
+
+    def test_index_lists_only_the_given_positions(self):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+
+        layout = OutputLayout(shard_size=2, index=True)
+        index_path = layout.write_index_file(output, [(1, "001/Track 001 - a.mp3"), (3, "002/Track 003 - c.mp3")])
+
+        self.assertEqual(index_path, os.path.join(output, INDEX_FILENAME))
+        with open(index_path, encoding="utf-8") as f:
+            self.assertEqual(f.read().splitlines(),
+                             ["position\tpath", "1\t001/Track 001 - a.mp3", "3\t002/Track 003 - c.mp3"])
+
+    def test_index_skips_tracks_that_failed_to_copy(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for name in ("a.mp3", "c.mp3"):
+            open(os.path.join(root, name), "wb").close()
+        # b.mp3 doesn't exist, so copying track 2 fails
+        order = [{"folder": root, "filename": name} for name in ("a.mp3", "b.mp3", "c.mp3")]
+
+        output = os.path.join(root, "out")
+        outcomes, index_path = TrackSyncEngine().copy_tracks(order, output, layout=OutputLayout(shard_size=2, index=True))
+
+        self.assertEqual([outcome.status for outcome in outcomes], ["copied", "copy_failed", "copied"])
+        with open(index_path, encoding="utf-8") as f:
+            self.assertEqual(f.read().splitlines(),
+                             ["position\tpath", "1\t001/Track 001 - a.mp3", "3\t002/Track 003 - c.mp3"])
+
+    def test_no_index_without_index_option(self):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output)
+
+        self.assertIsNone(OutputLayout().write_index_file(output, [(1, "Track 001 - a.mp3")]))
+        self.assertEqual(os.listdir(output), [])
+
+    def test_invalid_shard_size_is_rejected(self):
+        for shard_size in (0, -1, 2.5, True, "3"):
+            with self.assertRaises(ValueError, msg=repr(shard_size)):
+                OutputLayout(shard_size=shard_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tracksync_service import TrackSyncService, make_server
+
+
+def write_wav(path):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\0\0" * 800)
+
+
+class TrackSyncServiceTest(unittest.TestCase):
+    """Runs the HTTP service on a free localhost port against small WAV playlists."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.priority = os.path.join(self.root, "Playlist1")
+        self.secondary = os.path.join(self.root, "Playlist2")
+        os.makedirs(self.priority)
+        os.makedirs(self.secondary)
+        write_wav(os.path.join(self.priority, "001. First.wav"))
+        write_wav(os.path.join(self.priority, "002. Second.wav"))
+        # Untagged files all read as "Unknown Title", so this one matches a priority track
+        write_wav(os.path.join(self.secondary, "001. First.wav"))
+
+        self.servers = []
+
+    def tearDown(self):
+        for server, service in self.servers:
+            server.shutdown()
+            server.server_close()
+            service.stop()
+        shutil.rmtree(self.root)
+
+    def start(self, service, start_workers=True):
+        if start_workers:
+            service.start()
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers.append((server, service))
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def request(self, url, body=None):
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        req = urllib.request.Request(url, data=data, method="GET" if body is None else "POST")
+        try:
+            with urllib.request.urlopen(req, timeout=10) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    def wait_for(self, base, job):
+        deadline = time.time() + 10
+        while job["status"] not in ("done", "failed") and time.time() < deadline:
+            time.sleep(0.05)
+            status, job = self.request(f"{base}/jobs/{job['id']}")
+            self.assertEqual(status, 200)
+        return job
+
+    def job_body(self, **overrides):
+        body = {"priority": self.priority, "secondary": self.secondary, "output": "Merged"}
+        body.update(overrides)
+        return body
+
+    def test_job_runs_and_reports_status_and_metrics(self):
+        base = self.start(TrackSyncService(workers=2))
+
+        status, job = self.request(base + "/jobs", self.job_body(index=True))
+        self.assertEqual(status, 202)
+        self.assertEqual(job["status"], "queued")
+
+        job = self.wait_for(base, job)
+        self.assertEqual(job["status"], "done", job["error"])
+        self.assertEqual(job["summary"]["tracks"], 2)
+        self.assertEqual(job["summary"]["copied"], 2)
+        self.assertEqual(len(job["matches"]), 1)
+
+        output = os.path.join(self.root, "Merged")
+        self.assertEqual(sorted(os.listdir(output)),
+                         ["Track 001 - First.wav", "Track 002 - Second.wav", "tracksync_index.tsv"])
+
+        status, metrics = self.request(base + "/metrics")
+        self.assertEqual(status, 200)
+        self.assertEqual(metrics["completed_jobs"], 1)
+        self.assertEqual(metrics["files_copied"], 2)
+        self.assertEqual(metrics["queue_depth"], 0)
+        self.assertGreater(metrics["bytes_per_second"], 0)
+
+    def test_corrupt_file_is_reported_and_the_job_still_finishes(self):
+        with open(os.path.join(self.priority, "003. Broken.mp3"), "wb") as f:
+            f.write(b"this is not an mpeg stream" * 10)
+        base = self.start(TrackSyncService(workers=1))
+
+        status, job = self.request(base + "/jobs", self.job_body())
+        self.assertEqual(status, 202)
+
+        job = self.wait_for(base, job)
+        self.assertEqual(job["status"], "done", job["error"])
+        self.assertEqual(job["summary"]["copied"], 2)
+        self.assertEqual(job["summary"]["failed"], 1)
+
+        broken = [outcome for outcome in job["outcomes"] if outcome["status"] != "copied"]
+        self.assertEqual(os.path.basename(broken[0]["source"]), "003. Broken.mp3")
+        self.assertEqual(broken[0]["status"], "unreadable")
+
+    def test_bad_requests_get_400(self):
+        base = self.start(TrackSyncService(workers=1))
+
+        for body in (self.job_body(priority=os.path.join(self.root, "missing")),
+                     self.job_body(naming=[]),
+                     self.job_body(priority=[self.priority]),
+                     self.job_body(output=5),
+                     self.job_body(index="false"),
+                     self.job_body(shard_size=2.5),
+                     [self.priority]):
+            status, payload = self.request(base + "/jobs", body)
+            self.assertEqual(status, 400, body)
+            self.assertIn("error", payload)
+
+    def test_unknown_paths_get_404(self):
+        base = self.start(TrackSyncService(workers=1))
+
+        self.assertEqual(self.request(base + "/jobs/not-a-job")[0], 404)
+        self.assertEqual(self.request(base + "/nowhere")[0], 404)
+
+    def test_second_job_for_the_same_output_folder_gets_409(self):
+        # Workers are not started, so the first job stays queued
+        base = self.start(TrackSyncService(workers=2), start_workers=False)
+
+        self.assertEqual(self.request(base + "/jobs", self.job_body())[0], 202)
+        status, payload = self.request(base + "/jobs", self.job_body(output="./Merged", shard_size=2))
+        self.assertEqual(status, 409)
+        self.assertIn("error", payload)
+
+        self.assertEqual(self.request(base + "/jobs", self.job_body(output="Other"))[0], 202)
+
+    def test_full_queue_gets_503(self):
+        # Workers are not started, so the first job stays in the queue
+        base = self.start(TrackSyncService(workers=1, max_queue=1), start_workers=False)
+
+        self.assertEqual(self.request(base + "/jobs", self.job_body())[0], 202)
+        status, payload = self.request(base + "/jobs", self.job_body(output="Other"))
+        self.assertEqual(status, 503)
+        self.assertIn("error", payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,377 @@
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from mutagen import File, MutagenError
+from mutagen.id3 import ID3NoHeaderError
+
+from tracksync_layout import OutputLayout
+
+VALID_EXTENSIONS = (".mp3", ".flac", ".wav", ".m4a")
+
+
+def read_track_metadata(filepath):
+    """
+    Read the title, artist and track number tags of a single audio file.
+    Returns None if mutagen can't make sense of the file.
+    """
+    audio = File(filepath, easy=True)
+    if audio is None:
+        return None
+
+    # Safely retrieve tags
+    title = audio.get("title", ["Unknown Title"])[0]
+    artist = audio.get("artist", ["Unknown Artist"])[0]
+    track_num_str = audio.get("tracknumber", ["0"])[0]
+    track_num_str = track_num_str.split("/")[0]  # if tracknumber is something like "5/10"
+
+    try:
+        track_num_val = int(track_num_str)
+    except ValueError:
+        track_num_val = 0
+
+    return {"track_num": track_num_val, "title": title, "artist": artist}
+
+
+def cached_track_metadata(filepath, cache=None):
+    """
+    Same as read_track_metadata, but remembers the result in `cache` (a plain dict).
+    Entries are keyed by path and reused only while the file's mtime and size are unchanged,
+    so the GUI can warm the cache in the background before the merge starts.
+    """
+    if cache is None:
+        return read_track_metadata(filepath)
+
+    stat = os.stat(filepath)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    cached = cache.get(filepath)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    tags = read_track_metadata(filepath)
+    cache[filepath] = (signature, tags)
+    return tags
+
+
+class MetadataCache:
+    """
+    Thread-safe stand-in for the plain dict cached_track_metadata uses, holding at most
+    max_entries files. The least recently used entries are dropped first.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+def clean_filename_for_preserve_mode(filename):
+    """
+    For preserve mode: Remove existing "Track XXX -" prefixes to avoid duplication,
+    but keep other numbering in the filename (like "002." patterns).
+    """
+    # Remove existing "Track XXX -" pattern (case insensitive)
+    cleaned = re.sub(r'^Track\s+\d+\s*-\s*', '', filename, flags=re.IGNORECASE).strip()
+    return cleaned
+
+
+def remove_leading_track_number(name):
+    """
+    Removes leading track numbers and "Track XXX -" prefixes from filenames.
+    Examples:
+        "Track 001 - MySong.mp3"  -> "MySong.mp3"
+        "002. MySong.mp3"  -> "MySong.mp3"
+        "010 - Another.mp3" -> "Another.mp3"
+        "10  Some Song.mp3" -> "Some Song.mp3"
+    """
+    # First remove "Track XXX -" pattern (case insensitive)
+    name = re.sub(r'^Track\s+\d+\s*-\s*', '', name, flags=re.IGNORECASE).strip()
+
+    # Then remove simple numeric prefixes like "002." or "010 -"
+    name = re.sub(r'^\d+[\s\.\-_]*', '', name).strip()
+
+    return name
+
+
+def sanitize_filename(name):
+    # If using "NFKD" breaks certain Chinese characters, switch to "NFC".
+    name = unicodedata.normalize("NFKD", name)
+    # Replace illegal file characters
+    return re.sub(r'[\\/:*?"<>|]', "_", name)
+
+
+class PreserveNaming:
+    """
+    Keeps numbers already in the filename, only drops an old "Track XXX -" prefix.
+    '002. Song Title.mp3' -> 'Track 001 - 002. Song Title.mp3'
+    """
+    name = "Preserve Numbering"
+
+    def clean_filename(self, filename):
+        return clean_filename_for_preserve_mode(filename)
+
+
+class CleanNaming:
+    """
+    Strips every leading track number for a uniform look.
+    '002. Song Title.mp3' -> 'Track 001 - Song Title.mp3'
+    """
+    name = "Clean Numbering"
+
+    def clean_filename(self, filename):
+        return remove_leading_track_number(filename)
+
+
+# Naming styles by the names the GUI shows
+NAMING_STYLES = {style.name: style for style in (PreserveNaming(), CleanNaming())}
+
+
+@dataclass
+class FileOutcome:
+    """What happened to one source file: "copied", "copy_failed", "unreadable", "no_id3_header",
+    "not_found" or "permission_denied"."""
+    source: str
+    status: str
+    destination: str = None
+    bytes: int = 0
+    error: str = None
+
+    @property
+    def message(self):
+        """The line the command-line scripts print for this outcome."""
+        filename = os.path.basename(self.source)
+        if self.status == "copied":
+            return f"Copied: {filename} -> {os.path.basename(self.destination)}"
+        if self.status == "copy_failed":
+            return f"Error copying {filename}: {self.error}"
+        if self.status == "unreadable":
+            return f"Warning: Unable to read metadata for {filename}"
+        if self.status == "no_id3_header":
+            return f"Warning: {filename} has no ID3 header."
+        if self.status == "not_found":
+            return f"File not found: {filename}"
+        return f"Permission denied for: {filename}"
+
+
+@dataclass
+class MatchPair:
+    """A priority track and the secondary track it made redundant."""
+    priority: dict
+    secondary: dict
+    title_score: float
+    artist_score: float
+
+
+@dataclass
+class FolderState:
+    """The tracks loaded from a folder, plus the files that had to be skipped."""
+    folder: str
+    tracks: list
+    skipped: list
+
+
+@dataclass
+class MergeResult:
+    output_folder: str
+    order: list
+    matches: list
+    outcomes: list
+    timings: dict = field(default_factory=dict)
+    index_file: str = None
+
+    @property
+    def copied(self):
+        return [outcome for outcome in self.outcomes if outcome.status == "copied"]
+
+    @property
+    def failed(self):
+        return [outcome for outcome in self.outcomes if outcome.status != "copied"]
+
+
+class TrackSyncEngine:
+    """
+    Reusable merge engine shared by both naming modes.
+
+    Tag metadata is kept between calls, so merging the same folders again (or after the GUI has
+    prefetched them) only reads files that changed. Nothing is printed;
+    every call returns structured results instead.
+    """
+
+    def __init__(self, naming=None, metadata_cache=None, layout=None):
+        self.naming = naming or CleanNaming()
+        self.layout = layout or OutputLayout()
+        self.metadata_cache = {} if metadata_cache is None else metadata_cache
+
+    def track_metadata(self, filepath):
+        return cached_track_metadata(filepath, self.metadata_cache)
+
+    def load_folder(self, folder):
+        """
+        Read the tags of every audio file in `folder`, keeping folder order.
+        Unchanged files are served from the metadata cache.
+        """
+        tracks = []
+        skipped = []
+
+        for filename in os.listdir(folder):
+            if not filename.lower().endswith(VALID_EXTENSIONS):
+                continue
+
+            filepath = os.path.join(folder, filename)
+
+            try:
+                tags = self.track_metadata(filepath)
+            except ID3NoHeaderError as e:
+                skipped.append(FileOutcome(filepath, "no_id3_header", error=str(e)))
+                continue
+            except FileNotFoundError as e:
+                skipped.append(FileOutcome(filepath, "not_found", error=str(e)))
+                continue
+            except PermissionError as e:
+                skipped.append(FileOutcome(filepath, "permission_denied", error=str(e)))
+                continue
+            except MutagenError as e:
+                # Corrupt or truncated audio: skip the file instead of aborting the whole merge
+                skipped.append(FileOutcome(filepath, "unreadable", error=str(e)))
+                continue
+
+            if tags is None:
+                skipped.append(FileOutcome(filepath, "unreadable", error="Unable to read metadata"))
+                continue
+
+            tracks.append({
+                "folder_index": len(tracks),
+                "track_num": tags["track_num"],
+                "filename": filename,
+                "folder": folder,
+                "title": tags["title"],
+                "artist": tags["artist"]
+            })
+
+        return FolderState(folder, tracks, skipped)
+
+    def match_tracks(self, priority_files, secondary_files):
+        """
+        1) Preserve all priority_files exactly in order.
+        2) Attempt to match them to secondary_files based on high title/artist similarity.
+        3) Exclude matched secondary_files from being duplicated.
+        4) Add unmatched secondary_files at the end in the order they appear in the secondary folder.
+        Returns (order, matches).
+        """
+        used_secondary = set()
+        matches = []
+
+        for p in priority_files:
+            for s_index, s in enumerate(secondary_files):
+                if s_index in used_secondary:
+                    continue
+
+                title_similarity = SequenceMatcher(None, p["title"].lower(), s["title"].lower()).ratio()
+                artist_similarity = SequenceMatcher(None, p["artist"].lower(), s["artist"].lower()).ratio()
+
+                if title_similarity > 0.9 or (title_similarity > 0.75 and artist_similarity > 0.75):
+                    used_secondary.add(s_index)
+                    matches.append(MatchPair(p, s, title_similarity, artist_similarity))
+                    break
+
+        unmatched_secondary = [s for s_index, s in enumerate(secondary_files) if s_index not in used_secondary]
+
+        order = (sorted(priority_files, key=lambda x: x["folder_index"])
+                 + sorted(unmatched_secondary, key=lambda x: x["folder_index"]))
+        return order, matches
+
+    def copy_tracks(self, order, output_folder, naming=None, progress=None, layout=None):
+        """
+        Copy `order` into output_folder as "Track NNN - name", cleaning names with the given
+        naming style and placing them with the given OutputLayout (the engine's defaults otherwise).
+        Returns (outcomes, index_file), with one FileOutcome per track.
+        """
+        naming = naming or self.naming
+        layout = layout or self.layout
+        os.makedirs(output_folder, exist_ok=True)
+
+        outcomes = []
+        copied = []
+        created_folders = {output_folder}
+        for track_counter, item in enumerate(order, start=1):
+            src_path = os.path.join(item["folder"], item["filename"])
+            cleaned = naming.clean_filename(item["filename"])
+            relative_path = layout.track_path(track_counter, len(order), sanitize_filename(cleaned))
+            dest_path = layout.destination(output_folder, relative_path)
+
+            try:
+                dest_folder = os.path.dirname(dest_path)
+                if dest_folder not in created_folders:
+                    os.makedirs(dest_folder, exist_ok=True)
+                    created_folders.add(dest_folder)
+                shutil.copy2(src_path, dest_path)
+                outcomes.append(FileOutcome(src_path, "copied", dest_path, os.path.getsize(dest_path)))
+                copied.append((track_counter, relative_path))
+            except Exception as e:
+                outcomes.append(FileOutcome(src_path, "copy_failed", dest_path, error=str(e)))
+
+            if progress:
+                progress("copy", track_counter, len(order))
+
+        return outcomes, layout.write_index_file(output_folder, copied)
+
+    def merge(self, priority_folder, secondary_folder, output_folder, naming=None, progress=None,
+              layout=None):
+        """
+        Load both folders, match them and copy the merged playlist into output_folder.
+        `naming` and `layout` override the engine's defaults for this merge only.
+
+        `progress`, if given, is called as progress(stage, done, total) with stage one of
+        "load_priority", "load_secondary", "match" and "copy".
+        """
+        timings = {}
+        started = time.perf_counter()
+
+        def step(stage, func, *args):
+            if progress:
+                progress(stage, 0, 1)
+            stage_started = time.perf_counter()
+            value = func(*args)
+            timings[stage] = time.perf_counter() - stage_started
+            return value
+
+        priority = step("load_priority", self.load_folder, priority_folder)
+        secondary = step("load_secondary", self.load_folder, secondary_folder)
+        order, matches = step("match", self.match_tracks, priority.tracks, secondary.tracks)
+        copy_outcomes, index_file = step("copy", self.copy_tracks, order, output_folder, naming,
+                                         progress, layout)
+
+        timings["total"] = time.perf_counter() - started
+
+        return MergeResult(
+            output_folder=output_folder,
+            order=order,
+            matches=matches,
+            outcomes=priority.skipped + secondary.skipped + copy_outcomes,
+            timings=timings,
+            index_file=index_file,
+        )
@@ -0,0 +1,56 @@
+import os
+
+INDEX_FILENAME = "tracksync_index.tsv"
+
+
+class OutputLayout:
+    """
+    Decides where each merged track goes inside the output folder.
+
+    Track numbers are zero padded to fit the playlist (at least 3 digits, so "Track 001" stays
+    the same for small playlists while 1000+ tracks still sort correctly). With shard_size set,
+    tracks are spread over numbered subfolders of that many files each, e.g. "001/Track 0001 - ...".
+    With index=True, a tab separated index mapping track position to path is written next to them.
+    """
+
+    def __init__(self, shard_size=None, index=False):
+        if shard_size is not None:
+            if not isinstance(shard_size, int) or isinstance(shard_size, bool):
+                raise ValueError(f"shard_size must be a whole number: {shard_size!r}")
+            if shard_size < 1:
+                raise ValueError("shard_size must be at least 1")
+        self.shard_size = shard_size
+        self.index = index
+
+    def padding(self, track_count):
+        return max(3, len(str(track_count)))
+
+    def track_path(self, position, track_count, name):
+        """
+        Path of track number `position` (starting at 1) relative to the output folder, using "/".
+        """
+        filename = f"Track {position:0{self.padding(track_count)}d} - {name}"
+        if not self.shard_size:
+            return filename
+
+        shard_count = (track_count + self.shard_size - 1) // self.shard_size
+        shard = (position - 1) // self.shard_size + 1
+        return f"{shard:0{self.padding(shard_count)}d}/{filename}"
+
+    def destination(self, output_folder, relative_path):
+        return os.path.join(output_folder, *relative_path.split("/"))
+
+    def write_index_file(self, output_folder, entries):
+        """
+        Write "position<TAB>relative path" lines for the given (position, relative_path) pairs.
+        Returns the index path, or None when this layout has no index.
+        """
+        if not self.index:
+            return None
+
+        index_path = os.path.join(output_folder, INDEX_FILENAME)
+        with open(index_path, "w", encoding="utf-8") as f:
+            f.write("position\tpath\n")
+            for position, relative_path in entries:
+                f.write(f"{position}\t{relative_path}\n")
+        return index_path
@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracksync_engine import NAMING_STYLES, CleanNaming, MetadataCache, PreserveNaming, TrackSyncEngine
+from tracksync_layout import OutputLayout
+
+# Short names accepted in job requests, next to the GUI names in NAMING_STYLES
+NAMING_ALIASES = {"preserve": PreserveNaming.name, "clean": CleanNaming.name}
+
+
+class OutputFolderBusy(Exception):
+    """Another queued or running job is already writing to the same output folder."""
+
+
+@dataclass
+class Job:
+    id: str
+    priority_folder: str
+    secondary_folder: str
+    output_folder: str
+    naming: object
+    layout: object
+    status: str = "queued"
+    stage: str = None
+    done: int = 0
+    total: int = 0
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float = None
+    finished_at: float = None
+    result: object = None
+    error: str = None
+
+    def to_dict(self, details=False):
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "priority_folder": self.priority_folder,
+            "secondary_folder": self.secondary_folder,
+            "output_folder": self.output_folder,
+            "naming": self.naming.name,
+            "shard_size": self.layout.shard_size,
+            "progress": {"stage": self.stage, "done": self.done, "total": self.total},
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if self.result is not None:
+            data["summary"] = {
+                "tracks": len(self.result.order),
+                "matches": len(self.result.matches),
+                "copied": len(self.result.copied),
+                "failed": len(self.result.failed),
+                "timings": self.result.timings,
+                "index_file": self.result.index_file,
+            }
+            if details:
+                data["order"] = [os.path.join(t["folder"], t["filename"]) for t in self.result.order]
+                data["matches"] = [{
+                    "priority": os.path.join(m.priority["folder"], m.priority["filename"]),
+                    "secondary": os.path.join(m.secondary["folder"], m.secondary["filename"]),
+                    "title_score": m.title_score,
+                    "artist_score": m.artist_score,
+                } for m in self.result.matches]
+                data["outcomes"] = [vars(outcome) for outcome in self.result.outcomes]
+        return data
+
+
+class TrackSyncService:
+    """
+    Queues merge jobs and runs them on a fixed pool of worker threads.
+    All workers share one TrackSyncEngine, so tag metadata read for one job is reused by the next.
+    To keep memory flat in a long-running service, only the newest max_finished_jobs finished jobs
+    are kept, and the shared cache holds tags for at most max_cached_files files.
+    """
+
+    def __init__(self, workers=2, max_queue=100, engine=None, max_finished_jobs=100,
+                 max_cached_files=50000):
+        self.engine = engine or TrackSyncEngine(metadata_cache=MetadataCache(max_cached_files))
+        self.jobs = {}
+        self.max_finished_jobs = max_finished_jobs
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.worker_count = workers
+        self.threads = []
+
+        # Totals over finished jobs, for /metrics
+        self.completed_jobs = 0
+        self.failed_jobs = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        # Wall-clock time during which at least one job was running. Throughput is measured over
+        # this window, so jobs running side by side on different workers aren't counted twice.
+        self.running_jobs = 0
+        self.busy_since = None
+        self.busy_time = 0.0
+        self.files_copied = 0
+        self.bytes_copied = 0
+
+    def start(self):
+        for n in range(self.worker_count):
+            thread = threading.Thread(target=self._worker, name=f"tracksync-worker-{n}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def submit(self, priority_folder, secondary_folder, output_folder, naming="clean",
+               shard_size=None, index=False):
+        """
+        Validate a merge request and queue it. A relative output_folder is created next to the
+        priority folder, like the command-line script does. shard_size and index set the
+        OutputLayout. Raises ValueError for bad input, OutputFolderBusy when a queued or running
+        job already targets the same output folder, and queue.Full when the queue is at capacity.
+        """
+        for label, value in (("priority", priority_folder), ("secondary", secondary_folder),
+                             ("output", output_folder), ("naming", naming)):
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{label} must be a string")
+        if not isinstance(index, bool):
+            raise ValueError("index must be true or false")
+
+        if not priority_folder or not os.path.isdir(priority_folder):
+            raise ValueError(f"Priority folder not found: {priority_folder}")
+        if not secondary_folder or not os.path.isdir(secondary_folder):
+            raise ValueError(f"Secondary folder not found: {secondary_folder}")
+        if not output_folder:
+            raise ValueError("Missing output folder")
+
+        style = NAMING_STYLES.get(NAMING_ALIASES.get(naming, naming))
+        if style is None:
+            raise ValueError(f"Unknown naming style: {naming}")
+
+        layout = OutputLayout(shard_size=shard_size, index=index)
+
+        priority_folder = os.path.normpath(priority_folder)
+        output_folder = os.path.normpath(os.path.join(os.path.dirname(priority_folder), output_folder))
+
+        job = Job(uuid.uuid4().hex, priority_folder, os.path.normpath(secondary_folder),
+                  output_folder, style, layout)
+        with self.lock:
+            # Two jobs copying into one folder would overwrite each other's tracks and index
+            target = os.path.normcase(os.path.abspath(output_folder))
+            for other in self.jobs.values():
+                if (other.status in ("queued", "running")
+                        and os.path.normcase(os.path.abspath(other.output_folder)) == target):
+                    raise OutputFolderBusy(f"Job {other.id} is already writing to {output_folder}")
+            self.jobs[job.id] = job
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job.id]
+            raise
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def metrics(self):
+        with self.lock:
+            statuses = {}
+            for job in self.jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            finished = self.completed_jobs + self.failed_jobs
+            busy_time = self.busy_time
+            if self.running_jobs:
+                busy_time += time.monotonic() - self.busy_since
+            return {
+                "queue_depth": self.queue.qsize(),
+                "workers": self.worker_count,
+                "jobs": statuses,
+                "completed_jobs": self.completed_jobs,
+                "failed_jobs": self.failed_jobs,
+                "avg_job_latency": self.total_latency / finished if finished else 0.0,
+                "max_job_latency": self.max_latency,
+                "files_copied": self.files_copied,
+                "bytes_copied": self.bytes_copied,
+                "busy_seconds": busy_time,
+                "files_per_second": self.files_copied / busy_time if busy_time else 0.0,
+                "bytes_per_second": self.bytes_copied / busy_time if busy_time else 0.0,
+                "cached_files": len(self.engine.metadata_cache),
+            }
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            try:
+                self._run(job)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, job):
+        def on_progress(stage, done, total):
+            job.stage, job.done, job.total = stage, done, total
+
+        with self.lock:
+            if self.running_jobs == 0:
+                self.busy_since = time.monotonic()
+            self.running_jobs += 1
+
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = self.engine.merge(job.priority_folder, job.secondary_folder,
+                                           job.output_folder, naming=job.naming, progress=on_progress,
+                                           layout=job.layout)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        job.finished_at = time.time()
+
+        # Latency runs from submission, so time spent waiting in the queue counts too
+        latency = job.finished_at - job.submitted_at
+        with self.lock:
+            if job.status == "done":
+                self.completed_jobs += 1
+                self.files_copied += len(job.result.copied)
+                self.bytes_copied += sum(outcome.bytes for outcome in job.result.copied)
+            else:
+                self.failed_jobs += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.running_jobs -= 1
+            if self.running_jobs == 0:
+                self.busy_time += time.monotonic() - self.busy_since
+
+            # Jobs are stored in submission order, so the first finished ones are the oldest
+            finished = [job_id for job_id, stored in self.jobs.items() if stored.status in ("done", "failed")]
+            for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+                del self.jobs[job_id]
+
+
+class TrackSyncRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs          {"priority": ..., "secondary": ..., "output": ..., "naming": "clean"|"preserve",
+                         "shard_size": 1000, "index": true}
+    GET  /jobs          status of every job
+    GET  /jobs/<id>     status, progress and, once done, the full merge result
+    GET  /metrics       queue depth, job latency and copy throughput (files and bytes copied by
+                        finished jobs, per wall-clock second during which any job was running)
+    """
+    service = None
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/metrics":
+            self._send(200, self.service.metrics())
+        elif path == "/jobs":
+            with self.service.lock:
+                jobs = list(self.service.jobs.values())
+            self._send(200, {"jobs": [job.to_dict() for job in jobs]})
+        elif path.startswith("/jobs/"):
+            job = self.service.get(path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "Job not found"})
+            else:
+                self._send(200, job.to_dict(details=True))
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            self._send(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            job = self.service.submit(body.get("priority"), body.get("secondary"),
+                                      body.get("output"), body.get("naming", "clean"),
+                                      body.get("shard_size"), body.get("index", False))
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        except OutputFolderBusy as e:
+            self._send(409, {"error": str(e)})
+            return
+        except queue.Full:
+            self._send(503, {"error": "Job queue is full, try again later"})
+            return
+
+        self._send(202, job.to_dict())
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; job status is available over HTTP
+        pass
+
+
+def make_server(service, host="127.0.0.1", port=8765):
+    """
+    Build an HTTP server bound to `service`. Port 0 picks a free port (see server.server_address).
+    """
+    handler = type("BoundTrackSyncRequestHandler", (TrackSyncRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run TrackSync as a local HTTP job service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=100)
+    parser.add_argument("--max-finished-jobs", type=int, default=100)
+    parser.add_argument("--max-cached-files", type=int, default=50000)
+    args = parser.parse_args()
+
+    service = TrackSyncService(workers=args.workers, max_queue=args.max_queue,
+                               max_finished_jobs=args.max_finished_jobs,
+                               max_cached_files=args.max_cached_files)
+    service.start()
+    server = make_server(service, args.host, args.port)
+    print(f"TrackSync service listening on http://{args.host}:{server.server_address[1]}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -1,135 +1,45 @@
 import os
-import shutil
-from mutagen import File
-from mutagen.id3 import ID3NoHeaderError
-from difflib import SequenceMatcher
-import unicodedata
-import re
+from tracksync_engine import CleanNaming, TrackSyncEngine, remove_leading_track_number, sanitize_filename
+from tracksync_layout import OutputLayout
 
-def load_files_with_metadata(folder):
-    valid_extensions = (".mp3", ".flac", ".wav", ".m4a")
-    files_with_metadata = []
-    index = 0
+# remove_leading_track_number and sanitize_filename are re-exported from the engine
+__all__ = [
+    "load_files_with_metadata",
+    "match_tracks",
+    "remove_leading_track_number",
+    "renumber_and_copy_files",
+    "sanitize_filename",
+]
 
-    for filename in os.listdir(folder):
-        if not filename.lower().endswith(valid_extensions):
-            continue
+NAMING = CleanNaming()
 
-        filepath = os.path.join(folder, filename)
 
-        try:
-            audio = File(filepath, easy=True)
-            if audio is None:
-                print(f"Warning: Unable to read metadata for {filename}")
-                continue
+def load_files_with_metadata(folder, cache=None):
+    state = TrackSyncEngine(naming=NAMING, metadata_cache=cache).load_folder(folder)
+    for outcome in state.skipped:
+        print(outcome.message)
+    return state.tracks
 
-            title = audio.get("title", ["Unknown Title"])[0]
-            artist = audio.get("artist", ["Unknown Artist"])[0]
-            track_num_str = audio.get("tracknumber", ["0"])[0]
-            track_num_str = track_num_str.split("/")[0]
-
-            try:
-                track_num_val = int(track_num_str)
-            except ValueError:
-                track_num_val = 0
-
-            files_with_metadata.append({
-                "folder_index": index,
-                "track_num": track_num_val,
-                "filename": filename,
-                "folder": folder,
-                "title": title,
-                "artist": artist
-            })
-            index += 1
-
-        except ID3NoHeaderError:
-            print(f"Warning: {filename} has no ID3 header.")
-        except FileNotFoundError:
-            print(f"File not found: {filename}")
-        except PermissionError:
-            print(f"Permission denied for: {filename}")
-
-
-    return files_with_metadata
 
 def match_tracks(priority_files, secondary_files):
-    used_secondary = set()
-    matched_priority = []
-
-    # Attempt to match priority tracks to secondary ones
-    for p in priority_files:
-        for s_index, s in enumerate(secondary_files):
-            if s_index in used_secondary:
-                continue
-
-            title_similarity = SequenceMatcher(None, p["title"].lower(), s["title"].lower()).ratio()
-            artist_similarity = SequenceMatcher(None, p["artist"].lower(), s["artist"].lower()).ratio()
-
-            # Adjust thresholds as you like
-            if title_similarity > 0.9 or (title_similarity > 0.75 and artist_similarity > 0.75):
-                used_secondary.add(s_index)
-                break
-        matched_priority.append(p)
-
-    unmatched_secondary = [s for s_index, s in enumerate(secondary_files) if s_index not in used_secondary]
-
-    # Sort each list by original folder order
-    matched_priority_sorted = sorted(matched_priority, key=lambda x: x["folder_index"])
-    unmatched_secondary_sorted = sorted(unmatched_secondary, key=lambda x: x["folder_index"])
-
-    return matched_priority_sorted + unmatched_secondary_sorted
-
-def renumber_and_copy_files(final_list, output_folder):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    track_counter = 1
-    for item in final_list:
-        filename = item["filename"]
-        source_folder = item["folder"]
-
-        src_path = os.path.join(source_folder, filename)
-
-        # Remove all leading track numbers and prefixes
-        cleaned_original = remove_leading_track_number(filename)
-
-        # Sanitize and build new filename
-        new_filename = f"Track {track_counter:03d} - {sanitize_filename(cleaned_original)}"
-        track_counter += 1
-
-        dest_path = os.path.join(output_folder, new_filename)
-        try:
-            shutil.copy2(src_path, dest_path)
-            print(f"Copied: {filename} -> {new_filename}")
-        except Exception as e:
-            print(f"Error copying {filename}: {e}")
-
-def remove_leading_track_number(name):
-    """
-    Removes leading track numbers and "Track XXX -" prefixes from filenames.
-    Examples:
-        "Track 001 - MySong.mp3"  -> "MySong.mp3"
-        "002. MySong.mp3"  -> "MySong.mp3"
-        "010 - Another.mp3" -> "Another.mp3"
-        "10  Some Song.mp3" -> "Some Song.mp3"
-    """
-    # First remove "Track XXX -" pattern (case insensitive)
-    name = re.sub(r'^Track\s+\d+\s*-\s*', '', name, flags=re.IGNORECASE).strip()
-
-    # Then remove simple numeric prefixes like "002." or "010 -"
-    name = re.sub(r'^\d+[\s\.\-_]*', '', name).strip()
+    order, _ = TrackSyncEngine(naming=NAMING).match_tracks(priority_files, secondary_files)
+    return order
 
-    return name
 
-def sanitize_filename(name):
-    name = unicodedata.normalize("NFKD", name)
-    return re.sub(r'[\\/:*?"<>|]', "_", name)
+def renumber_and_copy_files(final_list, output_folder, layout=None):
+    # Leading track numbers are removed by CleanNaming before renumbering
+    outcomes, _ = TrackSyncEngine(naming=NAMING).copy_tracks(final_list, output_folder, layout=layout)
+    for outcome in outcomes:
+        print(outcome.message)
 
 if __name__ == "__main__":
     priority_folder = os.path.normpath(input("Enter the path to the priority folder: ").strip('"'))
     secondary_folder = os.path.normpath(input("Enter the path to the secondary folder: ").strip('"'))
     output_folder_name = input("Enter the output folder name: ").strip('"')
+    shard_answer = input("Files per subfolder (leave blank to keep all tracks in one folder): ").strip()
+    index_answer = input("Write a track index file? (y/N): ").strip().lower()
+    layout = OutputLayout(shard_size=int(shard_answer) if shard_answer else None,
+                          index=index_answer in ("y", "yes"))
 
     output_folder = os.path.join(os.path.dirname(priority_folder), output_folder_name)
 
@@ -143,6 +53,6 @@ if __name__ == "__main__":
     final_list = match_tracks(priority_files, secondary_files)
 
     print("Renumbering and copying files to output folder...")
-    renumber_and_copy_files(final_list, output_folder)
+    renumber_and_copy_files(final_list, output_folder, layout)
 
     print("Process completed successfully!")
\ No newline at end of file